@@ -1,5 +1,13 @@
+import io
+from typing import TYPE_CHECKING, Iterator, Optional, Union
+
 from requests import Response
 
+if TYPE_CHECKING:
+    import httpx
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
 
 class ResponseFile:
     """Binary content stream class
@@ -7,13 +15,52 @@ class ResponseFile:
     This object is returned from API functions that stream binary content.
     Call the API function from a `with` statement, and call the read method
     on the object to read the data in chunks.
+
+    Both requests and httpx responses are supported.
     """
 
-    def __init__(self, response: Response):
+    def __init__(self, response: Union[Response, "httpx.Response"]):
         self.response = response
 
     def __enter__(self):
-        return self.response.raw
+        if isinstance(self.response, Response):
+            self.response.raw.decode_content = True
+            return self.response.raw
+        return io.BufferedReader(_ChunkReader(self.response.iter_bytes()))
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.response.close()
+
+    def iter_content(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Iterate over the response body in fixed size chunks
+
+        Args:
+            chunk_size (int): The chunk size in bytes, default: 1 MiB
+
+        Returns:
+            Iterator[bytes]: The response body chunks
+        """
+        if isinstance(self.response, Response):
+            return self.response.iter_content(chunk_size=chunk_size)
+        return self.response.iter_bytes(chunk_size=chunk_size)
+
+
+class _ChunkReader(io.RawIOBase):
+    """Readable raw stream over an iterator of byte chunks"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer: Optional[bytes] = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            self._buffer = next(self._chunks, None)
+            if self._buffer is None:
+                return 0
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
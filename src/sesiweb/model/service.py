@@ -14,11 +14,17 @@ class ProductModel(BaseModel):
             'launcher-iso-py3', 'launcher-iso-py37', 'launcher-iso-py2'`
         platform (str): The operating system to install Houdini on: `'win64', 'macos',
             'macosx_arm64', 'linux'`. Does not effect Docker and SideFXLabs builds.
+
+    The model is frozen (immutable and hashable), and this configuration is
+    inherited by ProductBuild and DailyBuild.
     """
 
     product: str
     platform: str
 
+    class Config:
+        frozen = True
+
 
 class ProductBuild(ProductModel):
     """A full product with build and version num, based on ProductModel.
@@ -78,6 +84,9 @@ class InstallBuild(BaseModel):
     filename: str
     hash: str
 
+    class Config:
+        frozen = True
+
 
 class BuildDownloadModel(InstallBuild):
     """Full download metadata with build status, size and date introduced
@@ -117,7 +126,13 @@ class HServerModel(BaseModel):
     version: str
     products: str
 
+    class Config:
+        frozen = True
+
 
 class LicenseModel(BaseModel):
     license_keys: List[str]
     server_key: str
+
+    class Config:
+        frozen = True
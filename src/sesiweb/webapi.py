@@ -1,13 +1,29 @@
 import base64
+import functools
+import hashlib
 import html
 import json
+import threading
 import time
-from typing import Any, AnyStr, Dict, List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AnyStr, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlencode
 
 import requests
+from pydantic import BaseModel, parse_obj_as
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
 from .exceptions import APIError, AuthorizationError
 from .model.file import ResponseFile
 from .model.service import (
@@ -19,18 +35,45 @@ from .model.service import (
     ProductModel,
 )
 
+# SideFX Web API function names
+_CMD_DAILY_BUILDS = "download.get_daily_builds_list"
+_CMD_BUILD_DL = "download.get_daily_build_download"
+_CMD_NC_LIC = "license.get_non_commercial_license"
+
+# Seconds before expiry at which a cached access token is no longer reused
+TOKEN_EXPIRY_BUFFER = 60
+
+_TOKEN_CACHE: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+_TOKEN_CACHE_LOCK = threading.Lock()
+
+_MISSING = object()
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
 
 class SesiWeb:
     """Http client for SideFX Web API
 
-    Opens a synchronous requests http session for the SideFX Web API. A full
+    Uses a synchronous requests http session for the SideFX Web API, shared
+    between all instances so connections are kept alive and reused. A full
     length access token is created in the __init__ method, from the input
-    client_id and client_secret.
+    client_id and client_secret. Access tokens are cached per client and
+    token url, and reused by new instances until they are close to expiry.
 
     A custom endpoint can be used if necessary in the endpoint_url attribute.
 
+    The client can be used as a context manager, calling close on exit.
+
+    API calls can optionally be made with an HTTP/2 `httpx` client instead
+    of requests, by constructing with `backend="httpx"`. Build downloads
+    always use the requests session. The httpx backend only retries failed
+    connections; it does not retry rate limited (429) or server error
+    responses, or honour Retry-After headers, as the requests session does.
+
     Attributes:
-        session (requests.Session): The requests session.
+        session (requests.Session): The requests session, shared unless
+            constructed with `shared_session=False`.
         endpoint_url (str): The SideFX web API endpoint url, default:
             `https://www.sidefx.com/api/`
         access_token_url (str): The oauth2 application token url, default:
@@ -41,21 +84,84 @@ class SesiWeb:
 
     """
 
-    def __init__(self, client_id: str, client_secret: str) -> None:
+    # Serialized `[api_command, [], ` request envelope prefixes, see
+    # build_post_data
+    _PFX_DAILY_BUILDS = f'["{_CMD_DAILY_BUILDS}", [], '.encode()
+    _PFX_BUILD_DL = f'["{_CMD_BUILD_DL}", [], '.encode()
+    _PFX_NC_LIC = f'["{_CMD_NC_LIC}", [], '.encode()
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        shared_session: bool = True,
+        backend: str = "requests",
+    ) -> None:
         """Construct http session and access token
 
         Args:
             client_id (str): SideFX Application client id
             client_secret (str): SideFX Application secret key
+            shared_session (bool): Whether to use the module-level shared
+                session (True), or a session owned by this client (False),
+                default: True
+            backend (str): The http client used for API calls, `'requests'`
+                or `'httpx'` (requires the `http2` extra), default: `'requests'`
         """
-        self.session = get_session()
+        if backend not in ("requests", "httpx"):
+            raise ValueError(f"Unsupported backend: {backend!r}")
+
+        self._client = _build_httpx_client() if backend == "httpx" else None
+        self._owns_session = not shared_session
+        self.session = _build_session() if self._owns_session else get_session()
         self.endpoint_url = "https://www.sidefx.com/api/"
         self.access_token_url = "https://www.sidefx.com/oauth2/application_token"
-        self.access_token, self.expiry_time = get_access_token(
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self.access_token, self.expiry_time = get_cached_access_token(
             access_token_url=self.access_token_url,
             client_secret_key=client_secret,
             client_id=client_id,
         )
+        self._headers = {
+            "Authorization": f"Bearer {self.access_token}",
+            "Accept": "application/json, application/octet-stream",
+        }
+        if self._client is not None:
+            self._headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+    def refresh_token(self) -> None:
+        """Mint a new access token, replacing any cached token
+
+        Useful when the API rejects a token that has not yet expired, e.g.
+        after it was revoked server-side.
+        """
+        self.access_token, self.expiry_time = get_cached_access_token(
+            access_token_url=self.access_token_url,
+            client_secret_key=self._client_secret,
+            client_id=self._client_id,
+            force_refresh=True,
+        )
+        self._headers["Authorization"] = f"Bearer {self.access_token}"
+
+    def close(self) -> None:
+        """Release the resources held by the client
+
+        Closes the http session if it is owned by this client; the shared
+        session is left open for other instances. Also closes the httpx
+        client if used, and clears the memoized client credential headers.
+        """
+        if self._owns_session:
+            self.session.close()
+        if self._client is not None:
+            self._client.close()
+        _basic_auth.cache_clear()
+
+    def __enter__(self) -> "SesiWeb":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
 
     def get_latest_builds(
         self,
@@ -78,18 +184,16 @@ class SesiWeb:
             list[DailyBuild]: A list of builds, with returned metadata for each
                 build.
         """
-        api_command = "download.get_daily_builds_list"
+        build_dict = model_to_dict(prodinfo)
+        build_dict["only_production"] = only_production
 
-        build_dict = dict(prodinfo)
-        build_dict.update({"only_production": only_production})
-
-        post_data = {"json": json.dumps([api_command, [], build_dict])}
+        post_data = build_post_data(self._PFX_DAILY_BUILDS, build_dict)
         resp_builds = self.get_session_response(post_data)
 
         if prodfilter is not None:
             resp_builds = filter_list_response(resp_builds, prodfilter)
 
-        builds = [DailyBuild.parse_obj(resp_build) for resp_build in resp_builds]
+        builds = parse_obj_as(List[DailyBuild], resp_builds)
 
         return builds
 
@@ -127,14 +231,33 @@ class SesiWeb:
         Returns:
             BuildDownloadModel: Download, hash and filename data.
         """
-        api_command = "download.get_daily_build_download"
-
-        build_dict = dict(prodinfo)
-        post_data = {"json": json.dumps([api_command, [], build_dict])}
+        post_data = build_post_data(self._PFX_BUILD_DL, model_to_dict(prodinfo))
         resp_build = self.get_session_response(post_data)
         build_dl = BuildDownloadModel.parse_obj(resp_build)
         return build_dl
 
+    def get_build_downloads(
+        self, prods: List[Union[ProductBuild, dict]], max_workers: int = 10
+    ) -> List[BuildDownloadModel]:
+        """Get download info for several builds concurrently
+
+        Requests are made in parallel over the shared session, bounded by
+        max_workers. Results are returned in the same order as the inputs.
+
+        Args:
+            prods (list[ProductBuild | dict]): Info based on the appropriate
+                product, build and version, for each build.
+            max_workers (int): The maximum number of concurrent requests,
+                default: 10
+
+        Returns:
+            list[BuildDownloadModel]: Download, hash and filename data for
+                each build.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.get_build_download, p) for p in prods]
+            return [future.result() for future in futures]
+
     def get_nc_license(self, srvinfo: HServerModel):
         """Generate a non-commercial license key
 
@@ -145,53 +268,156 @@ class SesiWeb:
             LicenseModel: A full license key string accompanied with a matching
                 server key.
         """
-        api_command = "license.get_non_commercial_license"
-
-        build_dict = dict(srvinfo)
-        post_data = dict(json=json.dumps([api_command, [], build_dict]))
+        post_data = build_post_data(self._PFX_NC_LIC, model_to_dict(srvinfo))
         resp_build = self.get_session_response(post_data)
         build_dl = LicenseModel.parse_obj(resp_build)
         return build_dl
 
+    def download_build(
+        self, build_dl: BuildDownloadModel, timeout: Optional[int] = None
+    ) -> ResponseFile:
+        """Stream the binary for a build download
+
+        The response body is not buffered in memory; use the returned object
+        in a `with` statement and read the data in chunks.
+
+        Args:
+            build_dl (BuildDownloadModel): Download info from
+                get_build_download.
+            timeout (Optional[int]): Optional timeout length, default: None
+
+        Returns:
+            ResponseFile: A binary content stream of the build.
+        """
+        response = self.session.get(build_dl.download_url, stream=True, timeout=timeout)
+        if response.status_code != 200:
+            raise APIError(response.status_code, extract_traceback(response))
+        return ResponseFile(response)
+
     def get_session_response(
-        self, post_data: Dict[str, Any], timeout: Optional[int] = None
+        self,
+        post_data: Dict[str, Any],
+        timeout: Optional[int] = None,
+        stream: bool = False,
     ) -> Any:
         """Get an appropriate response from constructed requests session.
 
         Args:
             post_data (dict[str, Any]): SideFX Web API POST request data
             timeout (Optional[int]): Optional timeout length, default: None
+            stream (bool): Whether to stream a binary response rather than
+                buffering it in memory, default: False
 
         Returns:
             Any: Session response.
         """
-        response = self.session.post(
-            self.endpoint_url,
-            headers={"Authorization": f"Bearer {self.access_token}"},
-            data=post_data,
-            timeout=timeout,
-        )
+        if self._client is not None:
+            response = self._post_httpx(post_data, timeout, stream)
+        else:
+            response = self.session.post(
+                self.endpoint_url,
+                headers=self._headers,
+                data=post_data,
+                timeout=timeout,
+                stream=stream,
+            )
         if response.status_code == 200:
-            if response.headers.get("Content-Type") == "application/octet-stream":
+            content_type = response.headers.get("Content-Type", "")
+            if content_type.startswith("application/octet-stream"):
                 return ResponseFile(response)
-            return response.json()
+            return json_loads(response.content)
 
         raise APIError(response.status_code, extract_traceback(response))
 
+    def _post_httpx(
+        self, post_data: Dict[str, Any], timeout: Optional[int], stream: bool
+    ) -> "httpx.Response":
+        """Make an API POST request with the httpx client
+
+        Args:
+            post_data (dict[str, Any]): SideFX Web API POST request data
+            timeout (Optional[int]): Optional timeout length, the client
+                default is used if None
+            stream (bool): Whether to stream the response body. Only
+                successful binary responses are left unread.
+
+        Returns:
+            httpx.Response: The API response
+        """
+        request = self._client.build_request(
+            "POST",
+            self.endpoint_url,
+            content=urlencode(post_data),
+            headers=self._headers,
+            timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout,
+        )
+        response = self._client.send(request, stream=stream)
+        if stream:
+            content_type = response.headers.get("Content-Type", "")
+            if response.status_code != 200 or not content_type.startswith(
+                "application/octet-stream"
+            ):
+                response.read()
+        return response
+
+
+def _build_httpx_client() -> "httpx.Client":
+    """Build an HTTP/2 httpx client with connection retries
+
+    Returns:
+        httpx.Client: An httpx client
+    """
+    if httpx is None:
+        raise ImportError(
+            "The httpx backend requires httpx, install with `sesiweb[http2]`"
+        )
+    return httpx.Client(
+        http2=True,
+        timeout=httpx.Timeout(10.0, connect=5.0),
+        transport=httpx.HTTPTransport(http2=True, retries=3),
+    )
+
 
 def get_session() -> requests.Session:
-    """Get a requests http session
+    """Get the shared requests http session
+
+    The session is created on first use, and reused for all later calls so
+    that its connection pool is shared between `SesiWeb` instances.
+
+    Returns:
+        requests.Session: A http session
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = _build_session()
+        return _SESSION
+
+
+def _build_session() -> requests.Session:
+    """Build a requests http session with retries and a pooled adapter
+
+    Rate limited and server error responses are retried with exponential
+    backoff, honouring any Retry-After header. Once retries are exhausted
+    the last response is returned, so it is raised as an APIError.
 
     Returns:
         requests.Session: A http session
     """
     retry_strategy = Retry(
         total=3,
-        status_forcelist=[429],
-        method_whitelist=["GET", "POST"],
-        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "POST"]),
+        backoff_factor=1.0,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry_strategy,
+        pool_connections=4,
+        pool_maxsize=16,
+        pool_block=False,
     )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
     http = requests.Session()
     http.mount("https://", adapter)
     http.mount("http://", adapter)
@@ -227,13 +453,9 @@ def get_access_token(
     if access_token_url.endswith("/token") or access_token_url.endswith("/token/"):
         post_data["grant_type"] = "client_credentials"
 
-    auth_header = f"{client_id}:{client_secret_key}".encode()
-
     response = requests.post(
         access_token_url,
-        headers={
-            "Authorization": f"Basic {base64.b64encode(auth_header).decode('utf-8')}",
-        },
+        headers={"Authorization": _basic_auth(client_id, client_secret_key)},
         data=post_data,
         timeout=timeout,
     )
@@ -247,6 +469,65 @@ def get_access_token(
     return response_json["access_token"], access_token_expiry_time
 
 
+@functools.lru_cache(maxsize=16)
+def _basic_auth(client_id: str, client_secret_key: str) -> str:
+    """Build the Basic Authorization header value for client credentials
+
+    Args:
+        client_id (str): SideFX Web API supplied client id
+        client_secret_key (str): SideFX Web API supplied client secret
+
+    Returns:
+        str: The Authorization header value
+    """
+    credentials = f"{client_id}:{client_secret_key}".encode()
+    return f"Basic {base64.b64encode(credentials).decode('utf-8')}"
+
+
+def get_cached_access_token(
+    client_id: str,
+    client_secret_key: str,
+    access_token_url: str,
+    force_refresh: bool = False,
+) -> Tuple[str, float]:
+    """Get an access token, reusing a cached token if still valid
+
+    Tokens are cached by client id, token url and a hash of the client
+    secret. A cached token is reused while it has more than
+    `TOKEN_EXPIRY_BUFFER` seconds left before expiry.
+
+    Args:
+        client_id (str): SideFX Web API supplied client id
+        client_secret_key (str): SideFX Web API supplied client secret
+        access_token_url (str): The request URL made
+        force_refresh (bool): Mint a new token even if a valid one is cached,
+            default: False
+
+    Returns:
+        (str, float): A tuple containing the access token, and the time of
+            token expiry.
+    """
+    secret_hash = hashlib.sha256(client_secret_key.encode()).hexdigest()
+    key = (client_id, access_token_url, secret_hash)
+
+    if not force_refresh:
+        with _TOKEN_CACHE_LOCK:
+            entry = _TOKEN_CACHE.get(key)
+        if entry is not None and entry[1] - time.time() > TOKEN_EXPIRY_BUFFER:
+            return entry
+
+    # Mint outside the lock, so a slow token request doesn't block other
+    # clients from reading the cache
+    entry = get_access_token(
+        client_id=client_id,
+        client_secret_key=client_secret_key,
+        access_token_url=access_token_url,
+    )
+    with _TOKEN_CACHE_LOCK:
+        _TOKEN_CACHE[key] = entry
+    return entry
+
+
 def extract_traceback(response: requests.Response) -> AnyStr:
     """Extracts error message from non-200 response
 
@@ -265,17 +546,75 @@ def extract_traceback(response: requests.Response) -> AnyStr:
     if response.status_code != 500:
         return error_message
 
-    traceback = ""
-    for line in error_message.split("\n"):
-        if traceback and line == "</textarea>":
-            break
-        if line == "Traceback:" or traceback:
-            traceback += line + "\n"
+    start = error_message.find("Traceback:")
+    if start == -1:
+        return html.unescape(error_message)
+
+    end = error_message.find("</textarea>", start)
+    if end == -1:
+        end = len(error_message)
 
-    if traceback:
-        traceback = error_message
+    return html.unescape(error_message[start:end])
 
-    return html.unescape(traceback)
+
+def json_dumps(obj: Any) -> bytes:
+    """Serialize an object to JSON bytes, using orjson if installed
+
+    Args:
+        obj (Any): The object to serialize
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def json_loads(data: bytes) -> Any:
+    """Deserialize JSON bytes, using orjson if installed
+
+    Args:
+        data (bytes): The UTF-8 encoded JSON document
+
+    Returns:
+        Any: The deserialized object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def model_to_dict(data: Union[BaseModel, dict]) -> dict:
+    """Return a new dict from a pydantic model or dict
+
+    Args:
+        data (BaseModel | dict): The model or dict to convert
+
+    Returns:
+        dict: A dict copy of the input data
+    """
+    if isinstance(data, BaseModel):
+        return data.dict()
+    return dict(data)
+
+
+def build_post_data(prefix: bytes, payload: dict) -> Dict[str, bytes]:
+    """Construct SideFX Web API POST request data for a command
+
+    The request body is a JSON `[api_command, [], payload]` list. Only the
+    payload is serialized per call, and is joined to a pre-serialized
+    envelope prefix holding the constant api_command and args.
+
+    Args:
+        prefix (bytes): The serialized envelope prefix, e.g.
+            `b'["download.get_daily_builds_list", [], '`
+        payload (dict): Keyword arguments for the API function
+
+    Returns:
+        dict[str, bytes]: POST request data
+    """
+    return {"json": prefix + json_dumps(payload) + b"]"}
 
 
 def without_keys(dictionary: dict, keys_to_remove: List[str]) -> dict:
@@ -286,23 +625,24 @@ def without_keys(dictionary: dict, keys_to_remove: List[str]) -> dict:
         keys_to_remove (list[str]): Keys to remove
 
     Returns:
-        dict: Original dict with removed keys
+        dict: Original dict with removed keys, in insertion order
     """
-    return {key: dictionary[key] for key in dictionary.keys() - keys_to_remove}
+    if not isinstance(keys_to_remove, (set, frozenset)):
+        keys_to_remove = frozenset(keys_to_remove)
+    return {k: v for k, v in dictionary.items() if k not in keys_to_remove}
 
 
 def filter_list_response(results: List[dict], resfilter: dict) -> List[dict]:
     """Returns a filtered dict array
 
+    Dicts missing any of the filter keys are excluded.
+
     Args:
         results (list[dict]): A list of dict objects to filter
         resfilter (dict): Key/value pairs to filter by
 
     Returns:
-        list[dict]:
+        list[dict]: The dicts matching every key/value pair in resfilter
     """
-
-    def filter_func(d):
-        return all(d[k] == v if k in d else KeyError() for k, v in resfilter.items())
-
-    return list(filter(filter_func, results))
+    items = tuple(resfilter.items())
+    return [d for d in results if all(d.get(k, _MISSING) == v for k, v in items)]
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from src.sesiweb import SesiWeb
+from src.sesiweb.model.service import ProductModel
+
+client_id = os.environ.get("SIDEFX_CLIENT")
+client_secret = os.environ.get("SIDEFX_SECRET")
+
+
+@pytest.fixture(scope="session")
+def sesiweb():
+    with SesiWeb(client_id, client_secret) as sw:
+        yield sw
+
+
+@pytest.fixture(scope="session")
+def prodinfo():
+    return ProductModel(product="houdini", platform="linux")
+
+
+@pytest.fixture(scope="session")
+def prodfilter():
+    return {"status": "good", "release": "gold"}
+
+
+@pytest.fixture(scope="session")
+def latest_build(sesiweb, prodinfo, prodfilter):
+    return sesiweb.get_latest_build(
+        prodinfo=prodinfo, only_production=False, prodfilter=prodfilter
+    )
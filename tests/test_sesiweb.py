@@ -1,21 +1,41 @@
 import os
+import time
 
-from src.sesiweb import SesiWeb
-from src.sesiweb.model.service import ProductBuild, ProductModel
+import pytest
+import requests
+
+from src.sesiweb import SesiWeb, webapi
+from src.sesiweb.model.file import ResponseFile
+from src.sesiweb.model.service import ProductBuild
+from src.sesiweb.webapi import extract_traceback, filter_list_response
 
 client_id = os.environ.get("SIDEFX_CLIENT")
 client_secret = os.environ.get("SIDEFX_SECRET")
 
 
-def test_sesiweb_initialization():
-    sesiweb = SesiWeb(client_id, client_secret)
+def test_sesiweb_initialization(sesiweb):
     assert sesiweb is not None
 
 
-def test_get_latest_builds():
-    sesiweb = SesiWeb(client_id, client_secret)
-    prodinfo = ProductModel(product="houdini", platform="linux")
-    prodfilter = {"status": "good", "release": "gold"}
+def test_sesiweb_context_manager(monkeypatch):
+    closed = []
+    monkeypatch.setattr(requests.Session, "close", lambda self: closed.append(self))
+    monkeypatch.setattr(
+        webapi,
+        "get_cached_access_token",
+        lambda **kwargs: ("token", time.time() + 3600),
+    )
+
+    with SesiWeb("id", "secret", shared_session=False) as owned:
+        assert owned.session is not webapi.get_session()
+    assert closed == [owned.session]
+
+    with SesiWeb("id", "secret") as shared:
+        assert shared.session is webapi.get_session()
+    assert closed == [owned.session]
+
+
+def test_get_latest_builds(sesiweb, prodinfo, prodfilter):
     latest_builds = sesiweb.get_latest_builds(
         prodinfo=prodinfo, only_production=False, prodfilter=prodfilter
     )
@@ -23,24 +43,134 @@ def test_get_latest_builds():
     assert len(latest_builds) > 0
 
 
-def test_get_latest_build():
-    sesiweb = SesiWeb(client_id, client_secret)
-    prodinfo = ProductModel(product="houdini", platform="linux")
-    prodfilter = {"status": "good", "release": "gold"}
-    latest_builds = sesiweb.get_latest_build(
-        prodinfo=prodinfo, only_production=False, prodfilter=prodfilter
+def test_get_latest_build(latest_build):
+    assert latest_build is not None
+
+
+def test_get_dl(sesiweb, latest_build):
+    build_dl = sesiweb.get_build_download(prodinfo=ProductBuild(**latest_build.dict()))
+
+    assert build_dl is not None
+
+
+def test_filter_list_response():
+    results = [
+        {"status": "good", "release": "gold"},
+        {"status": "bad", "release": "gold"},
+        {"release": "gold"},
+    ]
+    filtered = filter_list_response(results, {"status": "good", "release": "gold"})
+    assert filtered == [{"status": "good", "release": "gold"}]
+
+
+def test_get_cached_access_token(monkeypatch):
+    calls = []
+
+    class TokenResponse:
+        status_code = 200
+
+        def __init__(self, expires_in):
+            self.expires_in = expires_in
+
+        def json(self):
+            return {"access_token": f"token{len(calls)}", "expires_in": self.expires_in}
+
+    def post(url, **kwargs):
+        calls.append(url)
+        return TokenResponse(expires_in[0])
+
+    expires_in = [3600]
+    monkeypatch.setattr(webapi, "_TOKEN_CACHE", {})
+    monkeypatch.setattr(webapi.requests, "post", post)
+    kwargs = {
+        "client_id": "id",
+        "client_secret_key": "secret",
+        "access_token_url": "url",
+    }
+
+    token, _ = webapi.get_cached_access_token(**kwargs)
+    assert token == "token1"
+    assert webapi.get_cached_access_token(**kwargs)[0] == "token1"
+    assert len(calls) == 1
+
+    token, _ = webapi.get_cached_access_token(force_refresh=True, **kwargs)
+    assert token == "token2"
+    assert webapi.get_cached_access_token(**kwargs)[0] == "token2"
+    assert len(calls) == 2
+
+    # A token within the expiry buffer is not reused
+    expires_in[0] = webapi.TOKEN_EXPIRY_BUFFER
+    webapi.get_cached_access_token(force_refresh=True, **kwargs)
+    token, _ = webapi.get_cached_access_token(**kwargs)
+    assert token == "token4"
+    assert len(calls) == 4
+
+    # Different secrets don't share a cached token
+    kwargs["client_secret_key"] = "other"
+    expires_in[0] = 3600
+    assert webapi.get_cached_access_token(**kwargs)[0] == "token5"
+
+
+def _error_response(status_code, text):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = text.encode()
+    response.encoding = "utf-8"
+    return response
+
+
+def test_extract_traceback():
+    body = "<html><textarea>\nTraceback:\n  File &quot;api.py&quot;\n</textarea>"
+    assert extract_traceback(_error_response(500, body)) == (
+        'Traceback:\n  File "api.py"\n'
     )
-    assert latest_builds is not None
 
+    body = "<html>\nTraceback:\n  KeyError: &#x27;build&#x27;\n"
+    assert extract_traceback(_error_response(500, body)) == (
+        "Traceback:\n  KeyError: 'build'\n"
+    )
 
-def test_get_dl():
-    sesiweb = SesiWeb(client_id, client_secret)
-    prodinfo = ProductModel(product="houdini", platform="linux")
-    prodfilter = {"status": "good", "release": "gold"}
-    latest_build = sesiweb.get_latest_build(
-        prodinfo=prodinfo, only_production=False, prodfilter=prodfilter
+    body = "Internal Server Error &amp; more"
+    assert extract_traceback(_error_response(500, body)) == (
+        "Internal Server Error & more"
     )
 
-    build_dl = sesiweb.get_build_download(prodinfo=ProductBuild(**latest_build.dict()))
 
-    assert build_dl is not None
+def test_httpx_backend_stream(monkeypatch):
+    httpx = pytest.importorskip("httpx")
+
+    class ChunkStream(httpx.SyncByteStream):
+        def __init__(self, data):
+            self.data = data
+
+        def __iter__(self):
+            yield self.data
+
+    def handler(request):
+        if b"binary" in request.content:
+            content_type, body = "application/octet-stream", b"data"
+        else:
+            content_type, body = "application/json", b'{"key": "value"}'
+        return httpx.Response(
+            200, headers={"Content-Type": content_type}, stream=ChunkStream(body)
+        )
+
+    monkeypatch.setattr(
+        webapi,
+        "get_cached_access_token",
+        lambda **kwargs: ("token", time.time() + 3600),
+    )
+    monkeypatch.setattr(
+        webapi,
+        "_build_httpx_client",
+        lambda: httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    with SesiWeb("id", "secret", backend="httpx") as sesiweb:
+        resp = sesiweb.get_session_response({"json": b"[]"}, stream=True)
+        assert resp == {"key": "value"}
+
+        resp = sesiweb.get_session_response({"json": b"binary"}, stream=True)
+        assert isinstance(resp, ResponseFile)
+        with resp as f:
+            assert f.read() == b"data"